@@ -1,5 +1,14 @@
+from functools import cache
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
+
+
+@cache
+def get_celery_app():
+    """Import the Celery app on first use so API startup doesn't load Celery"""
+    from app.celery import app
+
+    return app
@@ -1,39 +1,98 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
-from celery.result import AsyncResult
 from app.schemas.analysis import (
     AnalysisRequest,
     AnalysisResponse,
     AnalysisStatusResponse,
 )
-from app.tasks.analysis_task import financial_analysis_task
-from app.celery import app as celery_app
-from app.api.dependencies import limiter
+from app.tasks.keys import (
+    DEDUP_KEY_TTL,
+    analysis_dedup_key,
+    analysis_task_key,
+    progress_channel,
+)
+from app.api.dependencies import get_celery_app, limiter
 from app.core.config import settings
+from app.core.redis import get_redis
 from loguru import logger
-import json
+from redis.asyncio import Redis
+import orjson
 import asyncio
+import zlib
+from uuid import uuid4
 
 router = APIRouter()
 
+FINANCIAL_ANALYSIS_TASK = "app.tasks.analysis_task.financial_analysis"
+STREAM_TIMEOUT = 600  # 10 minutes, matches the task hard time limit
+KEEPALIVE_INTERVAL = 15  # Seconds of silence before sending an SSE comment
+MIN_POLL_DELAY = 0.25  # Fallback backend check right after a state change
+MAX_POLL_DELAY = 5.0  # Fallback backend check during long quiet phases
+MAX_STATUS_BATCH = 100  # Upper bound on task ids per batch status request
+DEDUP_CLAIM_ATTEMPTS = 3  # The key can expire between a failed claim and the read
+
+# Deletes a dedup key only while it still points at the given task, so releasing
+# it never drops the claim of a newer task for the same query
+RELEASE_DEDUP_KEY = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
 
 @router.post("/analysis/start", response_model=AnalysisResponse)
 @limiter.limit(settings.RATE_LIMIT_ANALYSIS)
-async def start_financial_analysis(request: Request, analysis_request: AnalysisRequest):
+async def start_financial_analysis(
+    request: Request,
+    analysis_request: AnalysisRequest,
+    redis: Redis = Depends(get_redis),
+):
     """
     Start a financial analysis task asynchronously
 
+    Identical requests made while a task is running (or whose result is still
+    stored) reuse that task instead of starting a new one.
+
     Returns task_id for status polling
     """
     try:
+        task_kwargs = {
+            "query": analysis_request.query,
+            "user_context": analysis_request.user_context,
+            "reasoning_depth": analysis_request.reasoning_depth,
+        }
+        dedup_key = analysis_dedup_key(**task_kwargs)
+
+        # Claim the key with the id up front so there is no window without one
+        task_id = str(uuid4())
+        for _ in range(DEDUP_CLAIM_ATTEMPTS):
+            if await redis.set(dedup_key, task_id, nx=True, ex=DEDUP_KEY_TTL):
+                break
+            existing_id = await redis.get(dedup_key)
+            if existing_id:
+                logger.info("Reusing analysis task: {}", existing_id.decode())
+                return AnalysisResponse(
+                    task_id=existing_id.decode(),
+                    status="reused",
+                    message="An identical analysis is already running. Use the task_id to check progress.",
+                )
+        else:
+            raise RuntimeError("Could not claim the analysis dedup key")
+
+        # Lets a cancel release the key, a revoked task never runs its cleanup
+        await redis.set(analysis_task_key(task_id), dedup_key, ex=DEDUP_KEY_TTL)
+
         # Start Celery task
-        task = financial_analysis_task.delay(
-            query=analysis_request.query,
-            user_context=analysis_request.user_context,
-            reasoning_depth=analysis_request.reasoning_depth,
-        )
+        try:
+            task = get_celery_app().send_task(
+                FINANCIAL_ANALYSIS_TASK, kwargs=task_kwargs, task_id=task_id
+            )
+        except Exception:
+            await redis.delete(dedup_key, analysis_task_key(task_id))
+            raise
 
-        logger.info(f"Started analysis task: {task.id}")
+        logger.info("Started analysis task: {}", task.id)
 
         return AnalysisResponse(
             task_id=task.id,
@@ -42,188 +101,310 @@ async def start_financial_analysis(request: Request, analysis_request: AnalysisR
         )
 
     except Exception as e:
-        logger.error(f"Failed to start analysis: {str(e)}")
+        logger.error("Failed to start analysis: {}", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def build_status_response(task_id: str, meta: dict) -> AnalysisStatusResponse:
+    """Build the status response for a task from its backend metadata"""
+    state = meta["status"]
+
+    response = {
+        "task_id": task_id,
+        "state": state,
+    }
+
+    if state == "PENDING":
+        response.update(
+            {
+                "status": "pending",
+                "message": "Task is waiting to be processed",
+                "progress": 0,
+            }
+        )
+    elif state == "PROGRESS":
+        # Get progress metadata
+        info = meta["result"] or {}
+        response.update(
+            {
+                "status": info.get("status", "processing"),
+                "message": info.get("message", "Processing..."),
+                "progress": info.get("progress", 0),
+                "phase": info.get("phase"),
+                "partial": info.get("partial"),
+            }
+        )
+    elif state == "SUCCESS":
+        response.update(
+            {
+                "status": "completed",
+                "message": "Analysis completed successfully",
+                "progress": 100,
+                "result": meta["result"],
+            }
+        )
+    elif state == "FAILURE":
+        response.update(
+            {
+                "status": "failed",
+                "message": "Analysis failed",
+                "error": str(meta["result"]),
+            }
+        )
+
+    return AnalysisStatusResponse(**response)
+
+
+async def read_task_meta(redis: Redis, backend, task_id: str) -> dict:
+    """Read a task's result backend metadata without blocking the event loop"""
+    raw = await redis.get(backend.get_key_for_task(task_id))
+    if raw is None:
+        return {"status": "PENDING", "result": None}
+    return backend.decode_result(raw)
+
+
+@router.get("/analysis/status", response_model=list[AnalysisStatusResponse])
+async def get_analysis_statuses(
+    ids: list[str] = Query(...), redis: Redis = Depends(get_redis)
+):
+    """
+    Get the status of several financial analysis tasks at once
+
+    All task metadata is fetched in a single MGET. At most
+    MAX_STATUS_BATCH ids are accepted per request.
+    """
+    if len(ids) > MAX_STATUS_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_STATUS_BATCH} task ids per request",
+        )
+
+    try:
+        backend = get_celery_app().backend
+        raw_metas = await redis.mget([backend.get_key_for_task(i) for i in ids])
+
+        return [
+            build_status_response(
+                task_id,
+                backend.decode_result(raw)
+                if raw is not None
+                else {"status": "PENDING", "result": None},
+            )
+            for task_id, raw in zip(ids, raw_metas)
+        ]
+
+    except Exception as e:
+        logger.error("Failed to get task statuses: {}", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/analysis/status/{task_id}", response_model=AnalysisStatusResponse)
-async def get_analysis_status(task_id: str):
+async def get_analysis_status(task_id: str, redis: Redis = Depends(get_redis)):
     """
     Get the status of a financial analysis task
 
     Returns current state, progress, and results
     """
     try:
-        task_result = AsyncResult(task_id, app=celery_app)
+        # One backend read yields both the state and its payload
+        meta = await read_task_meta(redis, get_celery_app().backend, task_id)
+        return build_status_response(task_id, meta)
 
-        response = {
-            "task_id": task_id,
-            "state": task_result.state,
-        }
+    except Exception as e:
+        logger.error("Failed to get task status: {}", e)
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if task_result.state == "PENDING":
-            response.update(
-                {
-                    "status": "pending",
-                    "message": "Task is waiting to be processed",
-                    "progress": 0,
-                }
-            )
-        elif task_result.state == "PROGRESS":
-            # Get progress metadata
-            info = task_result.info or {}
-            response.update(
-                {
-                    "status": info.get("status", "processing"),
-                    "message": info.get("message", "Processing..."),
-                    "progress": info.get("progress", 0),
-                    "phase": info.get("phase"),
-                }
-            )
-        elif task_result.state == "SUCCESS":
-            response.update(
-                {
-                    "status": "completed",
-                    "message": "Analysis completed successfully",
-                    "progress": 100,
-                    "result": task_result.result,
-                }
-            )
-        elif task_result.state == "FAILURE":
-            response.update(
-                {
-                    "status": "failed",
-                    "message": "Analysis failed",
-                    "error": str(task_result.info),
-                }
-            )
 
-        return AnalysisStatusResponse(**response)
+def sse_event(data: dict) -> bytes:
+    """Encode a payload as an SSE data frame"""
+    return b"data: " + orjson.dumps(data) + b"\n\n"
 
-    except Exception as e:
-        logger.error(f"Failed to get task status: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+
+async def gzip_stream(frames):
+    """Gzip an SSE stream, flushing after every frame so it stays live"""
+    compressor = zlib.compressobj(wbits=31)  # wbits=31 selects the gzip container
+    async for frame in frames:
+        yield compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def build_progress_event(state: str, info: dict) -> dict:
+    """Build the SSE payload for a non-terminal task state"""
+    if state == "PENDING":
+        return {
+            "state": "PENDING",
+            "message": "Task is queued",
+            "progress": 0,
+        }
+    if state == "PROGRESS":
+        return {
+            "state": "PROGRESS",
+            "phase": info.get("phase"),
+            "status": info.get("status"),
+            "message": info.get("message"),
+            "progress": info.get("progress", 0),
+            "partial": info.get("partial"),
+        }
+    # Unknown state
+    return {
+        "state": state,
+        "message": f"Task state: {state}",
+    }
+
+
+def build_final_event(meta: dict) -> dict:
+    """Build the SSE payload for a finished task from its stored result"""
+    if meta["status"] == "SUCCESS":
+        return {
+            "state": "SUCCESS",
+            "message": "Analysis completed",
+            "progress": 100,
+            "result": meta["result"],
+        }
+    return {
+        "state": "FAILURE",
+        "message": "Analysis failed",
+        "error": str(meta["result"]),
+    }
 
 
 @router.get("/analysis/stream/{task_id}")
-async def stream_analysis_progress(task_id: str):
+async def stream_analysis_progress(
+    request: Request, task_id: str, redis: Redis = Depends(get_redis)
+):
     """
     Stream analysis progress using Server-Sent Events (SSE)
 
-    This provides real-time updates to the frontend
+    This provides real-time updates to the frontend. Updates are pushed by the
+    worker over Redis pub/sub; the result backend is read on connect, once the
+    task finishes, and as a backing-off fallback while no updates arrive.
     """
 
     async def event_generator():
         """Generate SSE events with task progress updates"""
-        task_result = AsyncResult(task_id, app=celery_app)
-        last_info = None
-        iterations = 0
-        max_iterations = 600  # 10 minutes with 1s sleep
+        backend = get_celery_app().backend
+        pubsub = redis.pubsub()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + STREAM_TIMEOUT
 
         try:
-            while iterations < max_iterations:
-                current_state = task_result.state
-                current_info = task_result.info or {}
-
-                # Create a hashable representation for comparison
-                info_key = (
-                    current_state,
-                    current_info.get("phase"),
-                    current_info.get("progress"),
-                    current_info.get("status"),
+            # Subscribe before reading the current state so no update is missed
+            await pubsub.subscribe(progress_channel(task_id))
+
+            meta = await read_task_meta(redis, backend, task_id)
+            current_state = meta["status"]
+            if current_state in ["SUCCESS", "FAILURE"]:
+                yield sse_event(build_final_event(meta))
+                return
+
+            last_data = build_progress_event(current_state, meta["result"] or {})
+            yield sse_event(last_data)
+            last_sent = loop.time()
+            delay = MIN_POLL_DELAY
+            next_poll = loop.time() + delay
+
+            while loop.time() < deadline:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=max(next_poll - loop.time(), 0),
                 )
 
-                # Send update if anything changed OR every 5 seconds as heartbeat
-                should_send = (info_key != last_info) or (iterations % 5 == 0)
-
-                if should_send:
-                    if current_state == "PENDING":
-                        data = {
-                            "state": "PENDING",
-                            "message": "Task is queued",
-                            "progress": 0,
-                        }
-                    elif current_state == "PROGRESS":
-                        data = {
-                            "state": "PROGRESS",
-                            "phase": current_info.get("phase"),
-                            "status": current_info.get("status"),
-                            "message": current_info.get("message"),
-                            "progress": current_info.get("progress", 0),
-                        }
-                    elif current_state == "SUCCESS":
-                        data = {
-                            "state": "SUCCESS",
-                            "message": "Analysis completed",
-                            "progress": 100,
-                            "result": task_result.result,
-                        }
-                        yield f"data: {json.dumps(data)}\n\n"
-                        break  # Stop streaming
-                    elif current_state == "FAILURE":
-                        data = {
-                            "state": "FAILURE",
-                            "message": "Analysis failed",
-                            "error": str(current_info),
-                        }
-                        yield f"data: {json.dumps(data)}\n\n"
-                        break  # Stop streaming
-                    else:
-                        # Unknown state
-                        data = {
-                            "state": current_state,
-                            "message": f"Task state: {current_state}",
-                        }
-
-                    yield f"data: {json.dumps(data)}\n\n"
-                    last_info = info_key
+                if message is not None:
+                    update = orjson.loads(message["data"])
+                    current_state = update["state"]
+                    info = update["meta"]
+                    # Pushes are arriving, the fallback check can wait
+                    delay = MAX_POLL_DELAY
+                    next_poll = loop.time() + delay
+                else:
+                    # No push arrived, check the backend in case one was lost
+                    meta = await read_task_meta(redis, backend, task_id)
+                    current_state = meta["status"]
+                    info = meta["result"] or {}
 
-                # Check if task is complete
                 if current_state in ["SUCCESS", "FAILURE"]:
-                    break
-
-                # Wait before next check
-                await asyncio.sleep(1)
-                iterations += 1
-
-            # Send timeout message if it's exceeded max iterations
-            if iterations >= max_iterations:
-                timeout_data = {
-                    "state": "TIMEOUT",
-                    "message": "Streaming timeout reached",
-                }
-                yield f"data: {json.dumps(timeout_data)}\n\n"
+                    if message is not None:
+                        meta = await read_task_meta(redis, backend, task_id)
+                    yield sse_event(build_final_event(meta))
+                    return  # Stop streaming
+
+                data = build_progress_event(current_state, info)
+                changed = data != last_data
+                if changed:
+                    yield sse_event(data)
+                    last_data = data
+                    last_sent = loop.time()
+
+                if message is None:
+                    # A change only the backend showed means pushes may be
+                    # getting lost: check again soon, otherwise back off
+                    if changed:
+                        delay = MIN_POLL_DELAY
+                    else:
+                        delay = min(delay * 1.5, MAX_POLL_DELAY)
+                    next_poll = loop.time() + delay
+
+                # SSE comment keeps proxies from closing an idle stream
+                if loop.time() - last_sent >= KEEPALIVE_INTERVAL:
+                    yield b": keepalive\n\n"
+                    last_sent = loop.time()
+
+            # Send timeout message if the stream outlived the task time limit
+            timeout_data = {
+                "state": "TIMEOUT",
+                "message": "Streaming timeout reached",
+            }
+            yield sse_event(timeout_data)
 
         except Exception as e:
-            logger.error(f"Error in SSE stream for task {task_id}: {str(e)}")
+            logger.error("Error in SSE stream for task {}: {}", task_id, e)
             error_data = {
                 "state": "ERROR",
                 "message": f"Stream error: {str(e)}",
             }
-            yield f"data: {json.dumps(error_data)}\n\n"
+            yield sse_event(error_data)
+
+        finally:
+            await pubsub.aclose()
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Disable nginx buffering
+        "Connection": "keep-alive",
+        "Vary": "Accept-Encoding",
+    }
+    stream = event_generator()
+
+    # Repeated JSON keys make the frames highly compressible
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        stream = gzip_stream(stream)
 
     return StreamingResponse(
-        event_generator(),
+        stream,
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",  # Disable nginx buffering
-            "Connection": "keep-alive",
-        },
+        headers=headers,
     )
 
 
 @router.delete("/analysis/cancel/{task_id}")
-async def cancel_analysis(task_id: str):
+async def cancel_analysis(task_id: str, redis: Redis = Depends(get_redis)):
     """
     Cancel a running analysis task
+
+    Its dedup key is released, so identical requests start a new task instead
+    of reusing the cancelled one.
     """
     try:
-        celery_app.control.revoke(task_id, terminate=True)
-        logger.info(f"Cancelled task: {task_id}")
+        get_celery_app().control.revoke(task_id, terminate=True)
+        logger.info("Cancelled task: {}", task_id)
+
+        dedup_key = await redis.getdel(analysis_task_key(task_id))
+        if dedup_key:
+            await redis.eval(RELEASE_DEDUP_KEY, 1, dedup_key, task_id)
 
         return {"task_id": task_id, "status": "cancelled"}
 
     except Exception as e:
-        logger.error(f"Failed to cancel task: {str(e)}")
+        logger.error("Failed to cancel task: {}", e)
         raise HTTPException(status_code=500, detail=str(e))
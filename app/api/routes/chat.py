@@ -4,6 +4,7 @@ from app.schemas.chat import ChatRequest
 from app.services.openai_service import stream_chat_completion
 from app.api.dependencies import limiter
 from app.core.config import settings
+from loguru import logger
 
 router = APIRouter()
 
@@ -35,23 +36,12 @@ async def chat(request: Request, chat_request: ChatRequest):
                 },
             )
 
-        # Validate message format
-        for msg in chat_request.messages:
-            if "role" not in msg or "content" not in msg:
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "error": "Invalid request",
-                        "message": "Each message must have 'role' and 'content' fields.",
-                    },
-                )
-
         return StreamingResponse(
             stream_chat_completion(chat_request), media_type="text/event-stream"
         )
 
-    except Exception as e:
-        print(f"Chatbot API error: {e}")
+    except Exception:
+        logger.exception("Chatbot API error")
         return JSONResponse(
             status_code=500,
             content={
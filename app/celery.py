@@ -9,9 +9,9 @@ app = Celery(
 )
 
 # Task Serialization
-app.conf.task_serializer = "json"
-app.conf.result_serializer = "json"
-app.conf.accept_content = ["json"]
+app.conf.task_serializer = "msgpack"
+app.conf.result_serializer = "msgpack"
+app.conf.accept_content = ["msgpack", "json"]  # json: messages queued before rollout
 app.conf.enable_utc = True
 
 # Task Execution Settings
@@ -21,20 +21,24 @@ app.conf.task_soft_time_limit = 540  # Soft timeout: 9 minutes (raises exception
 app.conf.task_acks_late = True  # Acknowledge tasks after completion (safer)
 app.conf.task_reject_on_worker_lost = True  # Reject tasks if worker dies
 app.conf.worker_prefetch_multiplier = 1  # Process one task at a time
+# Stop tasks whose late-acked message will be redelivered after a broker
+# connection loss, instead of running them twice
+app.conf.worker_cancel_long_running_tasks_on_connection_loss = True
 
 # Result Backend Settings
 app.conf.result_expires = 3600  # Keep results for 1 hour
 app.conf.result_extended = True  # Store more task metadata
+app.conf.redis_max_connections = 32  # Result backend connection pool size
 app.conf.result_backend_transport_options = {
     "retry_on_timeout": True,
-    "max_connections": 10,
 }
 
 # Broker Settings - CRITICAL FOR LONG-RUNNING TASKS
 app.conf.broker_connection_retry_on_startup = True
+app.conf.broker_pool_limit = 32  # Reuse broker connections across publishes
 app.conf.broker_transport_options = {
     "visibility_timeout": 43200,  # 12 hours - tasks won't timeout in queue
-    "max_connections": 10,
+    "max_connections": 32,
     "retry_on_timeout": True,
     "health_check_interval": 10,
 }
@@ -0,0 +1,54 @@
+"""Redis-backed memoization for async functions."""
+
+from functools import wraps
+
+import orjson
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.core.redis import get_redis
+
+
+def cached(key_builder, ttl):
+    """
+    Cache truthy results of an async function in Redis as JSON.
+
+    Args:
+        key_builder: Called with the function arguments, returns the cache key
+            or None to bypass the cache for that call
+        ttl: Seconds to keep a cached result, or a callable taking the
+            function arguments and returning them
+
+    Cache errors never fail the call, the function just runs uncached.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = key_builder(*args, **kwargs)
+            if key is None:
+                return await func(*args, **kwargs)
+
+            redis = get_redis()
+            try:
+                hit = await redis.get(key)
+                if hit is not None:
+                    return orjson.loads(hit)
+            except RedisError as e:
+                logger.warning("Cache read failed for '{}': {}", key, e)
+
+            result = await func(*args, **kwargs)
+
+            # Empty results are usually misses or errors, don't pin them
+            if result:
+                try:
+                    expiry = ttl(*args, **kwargs) if callable(ttl) else ttl
+                    await redis.set(key, orjson.dumps(result), ex=expiry)
+                except RedisError as e:
+                    logger.warning("Cache write failed for '{}': {}", key, e)
+
+            return result
+
+        return wrapper
+
+    return decorator
@@ -1,37 +1,67 @@
-import os
+from functools import lru_cache
+from typing import Annotated
 from dotenv import load_dotenv
+from limits import parse_many
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, NoDecode
 
+# Export .env to os.environ as well: Prisma reads DATABASE_URL from there
 load_dotenv()
 
 
-class Settings:
+class Settings(BaseSettings):
+    model_config = {"frozen": True}
+
     # App
     APP_NAME: str = "PaceTerminal AI"
-    DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    DEBUG: bool = False
 
     # CORS
-    ALLOWED_ORIGINS: list[str] = os.getenv(
-        "ALLOWED_ORIGINS", "http://localhost:3000,https://paceterminal.com"
-    ).split(",")
+    ALLOWED_ORIGINS: Annotated[list[str], NoDecode] = [
+        "http://localhost:3000",
+        "https://paceterminal.com",
+    ]
 
     # OpenAI
-    OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_API_KEY: str = ""
+    OPENAI_MAX_CONCURRENCY: int = 20  # Chat completions in flight per process
 
     # Tavily
-    TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
+    TAVILY_API_KEY: str = ""
 
     # Database
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
-    DIRECT_URL: str = os.getenv("DIRECT_URL", "")
-    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    DATABASE_URL: str = ""
+    DIRECT_URL: str = ""
+    DATABASE_CONNECTION_LIMIT: int = 20  # Prisma pool size per process
+    DATABASE_POOL_TIMEOUT: int = 10  # Seconds to wait for a pooled connection
+    REDIS_URL: str = "redis://localhost:6379/0"
 
     # Rate Limiting
-    RATE_LIMIT_CHAT: str = os.getenv(
-        "RATE_LIMIT_CHAT", "10/minute"
-    )  # 10 requests per minute per IP
-    RATE_LIMIT_ANALYSIS: str = os.getenv(
-        "RATE_LIMIT_ANALYSIS", "3/minute"
-    )  # 3 analysis requests per minute per IP
+    RATE_LIMIT_CHAT: str = "10/minute"  # 10 requests per minute per IP
+    RATE_LIMIT_ANALYSIS: str = "3/minute"  # 3 analysis requests per minute per IP
+
+    @field_validator("ALLOWED_ORIGINS", mode="before")
+    @classmethod
+    def split_origins(cls, value):
+        """Accept a comma-separated list, as in .env.example"""
+        if isinstance(value, str):
+            return value.split(",")
+        return value
+
+    @field_validator("RATE_LIMIT_CHAT", "RATE_LIMIT_ANALYSIS")
+    @classmethod
+    def check_rate_limit(cls, value: str) -> str:
+        # Fail at startup on a malformed limit instead of on the first request.
+        # Limits stay plain strings: slowapi parses those once when the route
+        # is decorated, whereas a callable limit is re-parsed on every request.
+        parse_many(value)
+        return value
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings are read from the environment once per process."""
+    return Settings()
 
 
-settings = Settings()
+settings = get_settings()
@@ -1,12 +1,36 @@
+from datetime import timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from prisma import Prisma
 
-db = Prisma()
+from app.core.config import settings
+
+
+def pooled_database_url(url: str) -> str:
+    """
+    Add Prisma connection pool parameters to a database URL.
+
+    Values already present in the URL win. With PgBouncer in transaction mode
+    (pgbouncer=true), connection_limit caps this process' client connections
+    to PgBouncer, which multiplexes them onto its own server pool.
+    """
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.setdefault("connection_limit", str(settings.DATABASE_CONNECTION_LIMIT))
+    query.setdefault("pool_timeout", str(settings.DATABASE_POOL_TIMEOUT))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+db = Prisma(
+    datasource={"url": pooled_database_url(settings.DATABASE_URL)}
+    if settings.DATABASE_URL
+    else None
+)
 
 
 async def connect_db():
     """Connect to database."""
     if not db.is_connected():
-        await db.connect()
+        await db.connect(timeout=timedelta(seconds=10))
 
 
 async def disconnect_db():
@@ -1,5 +1,7 @@
 """System prompts for AI chat."""
 
+from functools import lru_cache
+
 PACETERMINAL_SYSTEM_PROMPT = """You are PACETERMINAL AI, a helpful assistant specialized in cryptocurrency, memecoins, and the PACETERMINAL platform.
 
 PACETERMINAL is a cryptocurrency token research and analysis platform focused on Solana blockchain tokens. Key features:
@@ -55,8 +57,14 @@ MEMBERSHIP BENEFITS:
 Remember: Always prioritize user education and safety in crypto investments. Acknowledge the high-risk nature of cryptocurrency investments."""
 
 
+@lru_cache(maxsize=8)
 def build_system_prompt_with_context(token_context: str = "") -> str:
-    """Build system prompt with optional token context."""
+    """
+    Build system prompt with optional token context.
+
+    The token context only changes when the recent tokens are refetched, so
+    the same prompt string is reused across chat turns.
+    """
     if token_context:
         return f"{PACETERMINAL_SYSTEM_PROMPT}\n\n{token_context}"
     return PACETERMINAL_SYSTEM_PROMPT
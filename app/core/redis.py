@@ -0,0 +1,26 @@
+from loguru import logger
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+
+# Shared by every Redis user in the API process (pub/sub, dedup keys, ...)
+pool = ConnectionPool.from_url(settings.REDIS_URL, max_connections=64)
+
+
+def get_redis() -> Redis:
+    """Redis client backed by the shared connection pool."""
+    return Redis(connection_pool=pool)
+
+
+async def warm_up_redis():
+    """Open a pooled Redis connection ahead of the first request."""
+    try:
+        await get_redis().ping()
+    except RedisError as e:
+        logger.warning("Redis connection warm-up failed: {}", e)
+
+
+async def close_redis():
+    """Close all pooled Redis connections."""
+    await pool.aclose()
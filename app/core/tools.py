@@ -1,11 +1,14 @@
 """OpenAI function/tool definitions for PACETERMINAL."""
 
-import json
+import orjson
+from loguru import logger
+from app.schemas.tools import GetTokenInfoArgs, SearchTokensArgs
 from app.services.token_service import get_token_by_name, search_tokens
 
 
-# Tool definitions for OpenAI function calling
-TOOLS = [
+# Tool definitions for OpenAI function calling (a tuple so it can't be mutated
+# per request; the SDK accepts any iterable)
+TOOLS = (
     {
         "type": "function",
         "function": {
@@ -45,7 +48,38 @@ TOOLS = [
             },
         },
     },
-]
+)
+
+
+async def get_token_info(args: GetTokenInfoArgs) -> dict:
+    """Handler for the get_token_info tool"""
+    result = await get_token_by_name(args.token_name)
+
+    if result is None:
+        return {
+            "error": f"Token '{args.token_name}' not found in PACETERMINAL database. It may not be listed yet or the name might be incorrect."
+        }
+
+    return result
+
+
+async def search_tokens_tool(args: SearchTokensArgs) -> dict:
+    """Handler for the search_tokens tool"""
+    results = await search_tokens(args.query, args.limit)
+
+    if not results:
+        return {
+            "message": f"No tokens found matching '{args.query}'. The database may not have tokens matching this criteria."
+        }
+
+    return {"results": results, "count": len(results)}
+
+
+# Tool name -> (argument model, handler)
+FUNCTIONS = {
+    "get_token_info": (GetTokenInfoArgs, get_token_info),
+    "search_tokens": (SearchTokensArgs, search_tokens_tool),
+}
 
 
 async def execute_function(function_name: str, arguments: dict) -> str:
@@ -59,37 +93,15 @@ async def execute_function(function_name: str, arguments: dict) -> str:
     Returns:
         JSON string containing the function result
     """
-    try:
-        if function_name == "get_token_info":
-            token_name = arguments.get("token_name")
-            result = await get_token_by_name(token_name)
-
-            if result is None:
-                return json.dumps(
-                    {
-                        "error": f"Token '{token_name}' not found in PACETERMINAL database. It may not be listed yet or the name might be incorrect."
-                    }
-                )
-
-            return json.dumps(result)
-
-        elif function_name == "search_tokens":
-            query = arguments.get("query")
-            limit = arguments.get("limit", 10)
-            results = await search_tokens(query, limit)
+    function = FUNCTIONS.get(function_name)
+    if function is None:
+        return orjson.dumps({"error": f"Unknown function: {function_name}"}).decode()
 
-            if not results:
-                return json.dumps(
-                    {
-                        "message": f"No tokens found matching '{query}'. The database may not have tokens matching this criteria."
-                    }
-                )
-
-            return json.dumps({"results": results, "count": len(results)})
-
-        else:
-            return json.dumps({"error": f"Unknown function: {function_name}"})
+    args_model, handler = function
+    try:
+        result = await handler(args_model.model_validate(arguments))
+        return orjson.dumps(result).decode()
 
     except Exception as e:
-        print(f"Error executing function {function_name}: {e}")
-        return json.dumps({"error": f"Error executing function: {str(e)}"})
+        logger.exception("Error executing function {}", function_name)
+        return orjson.dumps({"error": f"Error executing function: {str(e)}"}).decode()
@@ -0,0 +1,18 @@
+"""Cache keys for LLM responses, stored with app.core.cache.cached."""
+
+from hashlib import blake2b
+
+import orjson
+
+
+def normalize_text(text: str) -> str:
+    """Case and whitespace insensitive form of text, for exact-match keys."""
+    return " ".join(text.casefold().split())
+
+
+def llm_cache_key(namespace: str, *parts) -> str:
+    """Cache key of an LLM response, from everything its prompt is built on."""
+    digest = blake2b(
+        orjson.dumps(parts, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).hexdigest()
+    return f"llm:{namespace}:{digest}"
@@ -1,23 +1,35 @@
-import json
+import asyncio
+import re
+from textwrap import dedent
+from typing import Final
+import orjson
 from agents import function_tool
 from loguru import logger
-from app.llm.utils import openai_client, tavily_client
-
-
-@function_tool()
-async def research_plan(query: str, user_context: dict = None) -> str | None:
-    """
-    Decompose financial query into structured research sub-questions
-
-    Args:
-        query (str): The financial question or analysis request to plan research for
-        user_context (dict, optional): Optional user context (portfolio, time horizon, risk tolerance)
-
-    Returns:
-        str: The research plan
-    """
-
-    SYSTEM_PROMPT = """
+from app.core.cache import cached
+from app.llm.cache import llm_cache_key, normalize_text
+from app.llm.utils import openai_chat, tavily_client, truncate
+
+# Responses are reused for the exact same input only: questions that differ
+# only in ticker or date read almost alike, and a similar analysis may have
+# different gaps. Plans are keyed on the normalized question, so casing and
+# spacing differences still hit.
+RESEARCH_PLAN_CACHE_TTL = 6 * 60 * 60  # seconds
+SELF_REFLECTION_CACHE_TTL = 60 * 60  # seconds
+
+# Searches in flight at once per resource_search_batch call, to stay under the
+# Tavily and OpenAI rate limits
+SEARCH_BATCH_CONCURRENCY = 8
+
+# Search results fetched per query
+MAX_SEARCH_RESULTS = 8
+
+# Queries about recent events only search the last 30 days
+_RECENT_QUERY = re.compile(r"recent|latest|current|2024|2025", re.IGNORECASE)
+
+# System prompts are built once at import; only the user message varies per call.
+# They are dedented so the prefix stays compact and byte-identical across calls,
+# which is what lets OpenAI's prompt caching reuse it.
+_RESEARCH_PLAN_SYSTEM: Final[str] = dedent("""
         You are a financial research strategist who breaks down complex market questions into investigable components.
 
         # YOUR TASK
@@ -56,88 +68,14 @@ async def research_plan(query: str, user_context: dict = None) -> str | None:
         - Identify what data sources are needed for each dimension
         - Flag dependencies between sub-questions
         - Keep it focused: 4-6 dimensions maximum
-        """
-
-    context_str = ""
-    if user_context:
-        context_str = f"""
-            User Context:
-            - Portfolio: {user_context.get("portfolio", "Not specified")}
-            - Time horizon: {user_context.get("time_horizon", "Not specified")}
-            - Risk tolerance: {user_context.get("risk_tolerance", "Not specified")}
-        """
+        """).strip()
 
-    res = await openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": f"""
-                    Create a research plan for this financial question:
-                    {query}{context_str}
-                    """,
-            },
-        ],
-    )
-    return res.choices[0].message.content
+_RESEARCH_PLAN_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _RESEARCH_PLAN_SYSTEM,
+}
 
-
-@function_tool()
-async def resource_search(query: str, context: str = None) -> str | None:
-    """
-    Internet search for financial data, research, and market intelligence
-
-    Args:
-        query (str): The search query optimized for finding financial information (be specific, include dates if relevant)
-        context (str, optional): Optional context about what research dimension this search supports
-
-    Returns:
-        str: The financial search results
-    """
-
-    # Execute Tavily search with financial context
-    search_params = {
-        "query": query,
-        "include_raw_content": "markdown",
-        "max_results": 5,
-    }
-
-    # Add date filtering for time-sensitive queries
-    if any(
-        term in query.lower()
-        for term in ["recent", "latest", "current", "2024", "2025"]
-    ):
-        search_params["days"] = 30  # Last 30 days for recent queries
-
-    res = await tavily_client.search(**search_params)
-    search_results = res.get("results", [])
-
-    logger.info(
-        f"Successfully retrieved {len(search_results)} financial search results"
-    )
-
-    # Pre-process search results to reduce token count
-    processed_results = []
-    for idx, result in enumerate(search_results[:8], 1):  # Limit to top 8 results
-        # Truncate raw_content to first 1500 characters if it exists
-        raw_content = result.get("raw_content") or result.get("content") or ""
-        truncated_content = (
-            raw_content[:1500] + "..." if len(raw_content) > 1500 else raw_content
-        )
-
-        processed_results.append(
-            {
-                "title": result.get("title", ""),
-                "url": result.get("url", ""),
-                "content": truncated_content,
-                "score": result.get("score", 0),
-            }
-        )
-
-    logger.info("Processed and truncated search results for analysis")
-
-    SYSTEM_PROMPT = """
+_RESOURCE_SEARCH_SYSTEM: Final[str] = dedent("""
         You are a financial intelligence analyst extracting key insights from web sources.
 
         # TASK
@@ -177,53 +115,14 @@ async def resource_search(query: str, context: str = None) -> str | None:
         - Include multiple perspectives
         - Flag opinion vs. data
         - Be concise but precise
-        """
-
-    context_str = f"\n\nContext: {context}" if context else ""
+        """).strip()
 
-    res = await openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": f"""
-                    Query: {query}{context_str}
+_RESOURCE_SEARCH_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _RESOURCE_SEARCH_SYSTEM,
+}
 
-                    Search Results:
-                    {json.dumps(processed_results, indent=2)}
-                    """,
-            },
-        ],
-        temperature=0.3,
-        max_tokens=2000,
-    )
-
-    logger.info("Successfully generated financial search results")
-    return res.choices[0].message.content
-
-
-@function_tool()
-async def generate_analysis(
-    research_plan: str,
-    search_results: list,
-    reasoning_depth: str = "standard",
-    allow_checkpoints: bool = True,
-) -> str | None:
-    """
-    Synthesize research findings into structured financial analysis with transparent reasoning
-
-    Args:
-        research_plan (str): The original research plan with sub-questions
-        search_results (list): List of research findings from searches
-        reasoning_depth (str, optional): How deep to go with causal chain analysis. Defaults to "standard".
-        allow_checkpoints (bool, optional): Whether to include human-in-loop validation points. Defaults to True.
-
-    Returns:
-        str: The generated financial analysis
-    """
-
-    SYSTEM_PROMPT = """
+_GENERATE_ANALYSIS_SYSTEM: Final[str] = dedent("""
         You are a financial analyst who synthesizes research into clear, actionable insights with transparent reasoning.
 
         # YOUR TASK
@@ -292,56 +191,14 @@ async def generate_analysis(
         - Flag contradictions rather than hiding them
         - Connect analysis to actionable decisions
         - Be precise about time horizons and magnitudes
-        """
-
-    search_summary = "\n\n".join(
-        [f"**Source {i + 1}**: {result}" for i, result in enumerate(search_results)]
-    )
-
-    checkpoint_instruction = (
-        "\n\nIMPORTANT: Include human checkpoints at points of high uncertainty."
-        if allow_checkpoints
-        else ""
-    )
-
-    res = await openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": f"""
-                    Synthesize these research findings into a structured analysis:
-                    
-                    **Research Plan**:
-                    {research_plan}
-                    
-                    **Search Results**:
-                    {search_summary}
-                    
-                    Reasoning depth: {reasoning_depth}{checkpoint_instruction}
-                    """,
-            },
-        ],
-    )
+        """).strip()
 
-    return res.choices[0].message.content
+_GENERATE_ANALYSIS_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _GENERATE_ANALYSIS_SYSTEM,
+}
 
-
-@function_tool()
-async def self_reflection(analysis: str, quality_threshold: float = 8.0) -> str | None:
-    """
-    Validate analysis quality and identify gaps before delivery
-
-    Args:
-        analysis (str): The generated financial analysis to validate
-        quality_threshold (float, optional): Minimum quality score required (0-10 scale). Defaults to 8.0.
-
-    Returns:
-        str: The self-reflection report
-    """
-
-    SYSTEM_PROMPT = """
+_SELF_REFLECTION_SYSTEM: Final[str] = dedent("""
         You are a quality assurance analyst who validates financial research for completeness and logical consistency.
 
         # YOUR TASK
@@ -404,12 +261,239 @@ async def self_reflection(analysis: str, quality_threshold: float = 8.0) -> str
         - Prioritize issues by severity
         - Validate logic, not just check formatting
         - Ensure confidence levels match evidence strength
+        """).strip()
+
+_SELF_REFLECTION_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _SELF_REFLECTION_SYSTEM,
+}
+
+
+def research_plan_cache_key(query: str, user_context: dict = None) -> str:
+    """Cache key of a research plan, casing and spacing of the query aside."""
+    return llm_cache_key("research_plan", normalize_text(query), user_context)
+
+
+@function_tool()
+@cached(research_plan_cache_key, ttl=RESEARCH_PLAN_CACHE_TTL)
+async def research_plan(query: str, user_context: dict = None) -> str | None:
+    """
+    Decompose financial query into structured research sub-questions
+
+    Args:
+        query (str): The financial question or analysis request to plan research for
+        user_context (dict, optional): Optional user context (portfolio, time horizon, risk tolerance)
+
+    Returns:
+        str: The research plan
+    """
+
+    context_str = ""
+    if user_context:
+        context_str = f"""
+            User Context:
+            - Portfolio: {user_context.get("portfolio", "Not specified")}
+            - Time horizon: {user_context.get("time_horizon", "Not specified")}
+            - Risk tolerance: {user_context.get("risk_tolerance", "Not specified")}
         """
 
-    res = await openai_client.chat.completions.create(
+    res = await openai_chat(
+        model="gpt-4.1-mini",
+        messages=[
+            _RESEARCH_PLAN_MESSAGE,
+            {
+                "role": "user",
+                "content": f"""
+                    Create a research plan for this financial question:
+                    {query}{context_str}
+                    """,
+            },
+        ],
+        prompt_cache_key="research_plan_v1",
+    )
+    return res.choices[0].message.content
+
+
+async def _search_and_summarize(query: str, context: str = None) -> str | None:
+    """Run one Tavily search and summarize the results with the LLM."""
+
+    # Execute Tavily search with financial context
+    search_params = {
+        "query": query,
+        "include_raw_content": "markdown",
+        "max_results": MAX_SEARCH_RESULTS,
+    }
+
+    # Add date filtering for time-sensitive queries
+    if _RECENT_QUERY.search(query):
+        search_params["days"] = 30  # Last 30 days for recent queries
+
+    res = await tavily_client.search(**search_params)
+    search_results = res.get("results", [])
+
+    logger.info(
+        "Successfully retrieved {} financial search results", len(search_results)
+    )
+
+    # Pre-process search results to reduce token count
+    processed_results = [
+        {
+            "title": result.get("title", ""),
+            "url": result.get("url", ""),
+            "content": truncate(
+                result.get("raw_content") or result.get("content") or ""
+            ),
+            "score": result.get("score", 0),
+        }
+        for result in search_results
+    ]
+
+    logger.info("Processed and truncated search results for analysis")
+
+    context_str = f"\n\nContext: {context}" if context else ""
+
+    res = await openai_chat(
+        model="gpt-4o-mini",
+        messages=[
+            _RESOURCE_SEARCH_MESSAGE,
+            {
+                "role": "user",
+                "content": f"""
+                    Query: {query}{context_str}
+
+                    Search Results:
+                    {orjson.dumps(processed_results).decode()}
+                    """,
+            },
+        ],
+        temperature=0.3,
+        max_tokens=2000,
+        prompt_cache_key="resource_search_v1",
+    )
+
+    logger.info("Successfully generated financial search results")
+    return res.choices[0].message.content
+
+
+@function_tool()
+async def resource_search(query: str, context: str = None) -> str | None:
+    """
+    Internet search for financial data, research, and market intelligence
+
+    Args:
+        query (str): The search query optimized for finding financial information (be specific, include dates if relevant)
+        context (str, optional): Optional context about what research dimension this search supports
+
+    Returns:
+        str: The financial search results
+    """
+    return await _search_and_summarize(query, context)
+
+
+@function_tool()
+async def resource_search_batch(
+    queries: list[str], contexts: list[str] | None = None
+) -> list[str | None]:
+    """
+    Run several internet searches for financial data concurrently, one per research dimension
+
+    Args:
+        queries (list[str]): The search queries, one per research dimension (be specific, include dates if relevant)
+        contexts (list[str], optional): Optional context for each query, matched by position
+
+    Returns:
+        list[str]: The financial search results, in the same order as the queries
+    """
+    contexts = contexts or []
+    semaphore = asyncio.Semaphore(SEARCH_BATCH_CONCURRENCY)
+
+    async def search(idx: int, query: str) -> str | None:
+        async with semaphore:
+            context = contexts[idx] if idx < len(contexts) else None
+            return await _search_and_summarize(query, context)
+
+    return await asyncio.gather(
+        *(search(idx, query) for idx, query in enumerate(queries))
+    )
+
+
+@function_tool()
+async def generate_analysis(
+    research_plan: str,
+    search_results: list,
+    reasoning_depth: str = "standard",
+    allow_checkpoints: bool = True,
+) -> str | None:
+    """
+    Synthesize research findings into structured financial analysis with transparent reasoning
+
+    Args:
+        research_plan (str): The original research plan with sub-questions
+        search_results (list): List of research findings from searches
+        reasoning_depth (str, optional): How deep to go with causal chain analysis. Defaults to "standard".
+        allow_checkpoints (bool, optional): Whether to include human-in-loop validation points. Defaults to True.
+
+    Returns:
+        str: The generated financial analysis
+    """
+
+    search_summary = "\n\n".join(
+        [f"**Source {i + 1}**: {result}" for i, result in enumerate(search_results)]
+    )
+
+    checkpoint_instruction = (
+        "\n\nIMPORTANT: Include human checkpoints at points of high uncertainty."
+        if allow_checkpoints
+        else ""
+    )
+
+    res = await openai_chat(
+        model="gpt-4.1-mini",
+        messages=[
+            _GENERATE_ANALYSIS_MESSAGE,
+            {
+                "role": "user",
+                "content": f"""
+                    Synthesize these research findings into a structured analysis:
+                    
+                    **Research Plan**:
+                    {research_plan}
+                    
+                    **Search Results**:
+                    {search_summary}
+                    
+                    Reasoning depth: {reasoning_depth}{checkpoint_instruction}
+                    """,
+            },
+        ],
+        prompt_cache_key="generate_analysis_v1",
+    )
+
+    return res.choices[0].message.content
+
+
+def self_reflection_cache_key(analysis: str, quality_threshold: float = 8.0) -> str:
+    """Cache key of a review of the exact analysis."""
+    return llm_cache_key("self_reflection", analysis, quality_threshold)
+
+
+@function_tool()
+@cached(self_reflection_cache_key, ttl=SELF_REFLECTION_CACHE_TTL)
+async def self_reflection(analysis: str, quality_threshold: float = 8.0) -> str | None:
+    """
+    Validate analysis quality and identify gaps before delivery
+
+    Args:
+        analysis (str): The generated financial analysis to validate
+        quality_threshold (float, optional): Minimum quality score required (0-10 scale). Defaults to 8.0.
+
+    Returns:
+        str: The self-reflection report
+    """
+    res = await openai_chat(
         model="gpt-4.1-mini",
         messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
+            _SELF_REFLECTION_MESSAGE,
             {
                 "role": "user",
                 "content": f"""
@@ -420,5 +504,6 @@ async def self_reflection(analysis: str, quality_threshold: float = 8.0) -> str
                     """,
             },
         ],
+        prompt_cache_key="self_reflection_v1",
     )
     return res.choices[0].message.content
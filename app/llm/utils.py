@@ -1,9 +1,69 @@
+import asyncio
+import httpx
+from loguru import logger
 from openai import AsyncOpenAI
 from tavily import AsyncTavilyClient
 
 from app.core.config import settings
 
-openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+# One pooled HTTP/2 client: concurrent LLM calls multiplex over a few kept-alive
+# TLS connections instead of queueing on the SDK's default pool
+http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(
+        max_connections=200,
+        max_keepalive_connections=100,
+        keepalive_expiry=60,
+    ),
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+
+# The SDK retries 429s and 5xx itself, with exponential backoff that honours
+# Retry-After
+openai_client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    http_client=http_client,
+    max_retries=5,
+)
 tavily_client = AsyncTavilyClient(
     api_key=settings.TAVILY_API_KEY,
 )
+
+
+async def warm_up_openai():
+    """
+    Open a pooled connection to the OpenAI API ahead of the first request.
+
+    Any response will do, the point is the TLS and HTTP/2 handshake.
+    """
+    try:
+        await http_client.head(str(openai_client.base_url))
+    except httpx.HTTPError as e:
+        logger.warning("OpenAI connection warm-up failed: {}", e)
+
+
+# Caps chat completions in flight per process, API or worker, so bursts queue
+# here instead of tripping the account rate limit and piling up retries
+_openai_semaphore = asyncio.Semaphore(settings.OPENAI_MAX_CONCURRENCY)
+
+
+async def openai_chat(**kwargs):
+    """
+    Create a chat completion once a concurrency slot is free.
+
+    For streamed completions the slot is released once the stream is opened,
+    so it bounds request starts rather than open streams.
+    """
+    async with _openai_semaphore:
+        return await openai_client.chat.completions.create(**kwargs)
+
+
+# Characters kept from each scraped search result passed to the LLM
+MAX_RESULT_CHARS = 1500
+
+
+def truncate(content: str, limit: int = MAX_RESULT_CHARS) -> str:
+    """Cut content to limit characters, marking the cut with an ellipsis."""
+    if len(content) <= limit:
+        return content
+    return content[:limit] + "..."
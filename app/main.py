@@ -1,22 +1,40 @@
+import asyncio
+import sys
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from loguru import logger
 from app.core.config import settings
 from app.core.database import connect_db, disconnect_db
+from app.core.redis import close_redis, warm_up_redis
+from app.llm.utils import http_client, warm_up_openai
 from app.api.routes import chat, items, analysis
 from app.api.dependencies import limiter
 
+# Log through a background queue so request handlers never block on stderr
+logger.remove()
+logger.add(
+    sys.stderr,
+    enqueue=True,
+    backtrace=False,
+    diagnose=False,
+    level="DEBUG" if settings.DEBUG else "INFO",
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan events."""
-    # Startup: Connect to database
-    await connect_db()
+    # Startup: Connect to database and open Redis and OpenAI connections
+    # together, so the first request doesn't pay for the handshakes
+    await asyncio.gather(connect_db(), warm_up_redis(), warm_up_openai())
     yield
-    # Shutdown: Disconnect from database
-    await disconnect_db()
+    # Shutdown: Disconnect from database and Redis, close LLM connections
+    await asyncio.gather(disconnect_db(), close_redis(), http_client.aclose())
+    await logger.complete()
 
 
 app = FastAPI(title=settings.APP_NAME, debug=settings.DEBUG, lifespan=lifespan)
@@ -34,6 +52,10 @@ app.add_middleware(
     allow_headers=["Content-Type", "Authorization"],
 )
 
+# Compress JSON responses. Event streams are skipped by the middleware: chat
+# streams uncompressed, analysis progress compresses its own frames.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(chat.router, tags=["chat"])
 app.include_router(items.router, tags=["items"])
@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class TokenBase(BaseModel):
@@ -34,5 +34,4 @@ class TokenResponse(TokenBase):
     created_by: str | None
     archived_at: datetime | None
 
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
@@ -27,5 +27,6 @@ class AnalysisStatusResponse(BaseModel):
     message: Optional[str] = None
     progress: Optional[int] = None
     phase: Optional[str] = None
+    partial: Optional[str] = None  # Tail of the text being generated
     result: Optional[dict] = None
     error: Optional[str] = None
@@ -1,8 +1,14 @@
+from typing import Literal
 from pydantic import BaseModel
 
 
+class ChatMessage(BaseModel):
+    role: Literal["user", "assistant", "system"]
+    content: str
+
+
 class ChatRequest(BaseModel):
-    messages: list[dict[str, str]]
+    messages: list[ChatMessage]
     model: str = "gpt-4o-mini"
     temperature: float = 0.7
     max_tokens: int | None = None
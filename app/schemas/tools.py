@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class GetTokenInfoArgs(BaseModel):
+    """Arguments of the get_token_info tool"""
+
+    token_name: str
+
+
+class SearchTokensArgs(BaseModel):
+    """Arguments of the search_tokens tool"""
+
+    query: str
+    limit: int = 10
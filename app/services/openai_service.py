@@ -1,10 +1,29 @@
-import json
-from app.llm.utils import openai_client
+import asyncio
+import re
+import orjson
+from loguru import logger
+from app.llm.utils import openai_chat
 from app.schemas.chat import ChatRequest
 from app.core.prompts import build_system_prompt_with_context
-from app.services.token_service import get_recent_tokens, build_token_context
+from app.services.token_service import get_recent_tokens_with_context
 from app.core.tools import TOOLS, execute_function
 
+# Greetings and acknowledgements never need a token lookup, so they are sent
+# without the tool schemas. Anything else keeps the tools: token names can't
+# be told apart from other words with a pattern.
+SMALL_TALK = re.compile(
+    r"(hi|hello|hey|yo|gm|gn|thanks|thank you|thx|ok|okay|cool|nice|bye)[\s!.?]*",
+    re.IGNORECASE,
+)
+
+
+def needs_tools(request: ChatRequest) -> bool:
+    """Whether the latest user message may need the token tools."""
+    for message in reversed(request.messages):
+        if message.role == "user":
+            return not SMALL_TALK.fullmatch(message.content.strip())
+    return True
+
 
 async def stream_chat_completion(request: ChatRequest):
     """
@@ -13,66 +32,99 @@ async def stream_chat_completion(request: ChatRequest):
     Supports OpenAI function calling to retrieve token information from the database.
     """
     # Fetch recent tokens for context
-    tokens = await get_recent_tokens(limit=50)
-    token_context = build_token_context(tokens)
+    _, token_context = await get_recent_tokens_with_context(limit=50)
 
     # Build system prompt with token context
     system_prompt = build_system_prompt_with_context(token_context)
 
     # Prepare messages with system prompt
-    messages = [{"role": "system", "content": system_prompt}] + request.messages
+    messages = [{"role": "system", "content": system_prompt}] + [
+        msg.model_dump() for msg in request.messages
+    ]
+
+    tool_options = (
+        {"tools": TOOLS, "tool_choice": "auto"} if needs_tools(request) else {}
+    )
 
-    # Initial API call with tools
-    response = await openai_client.chat.completions.create(
+    # Single streaming call with tools: content goes to the client as it
+    # arrives, tool call fragments are stitched together by index
+    stream = await openai_chat(
         model=request.model,
         messages=messages,
         temperature=request.temperature,
         max_tokens=request.max_tokens or 1000,
-        tools=TOOLS,
-        tool_choice="auto",
-        stream=False,  # First call non-streaming to check for tool calls
+        stream=True,
+        **tool_options,
     )
 
-    response_message = response.choices[0].message
-    tool_calls = response_message.tool_calls
+    content_parts = []
+    tool_calls = {}
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            yield delta.content
+        for fragment in delta.tool_calls or ():
+            tool_call = tool_calls.setdefault(
+                fragment.index,
+                {
+                    "id": "",
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""},
+                },
+            )
+            if fragment.id:
+                tool_call["id"] = fragment.id
+            if fragment.function:
+                if fragment.function.name:
+                    tool_call["function"]["name"] += fragment.function.name
+                if fragment.function.arguments:
+                    tool_call["function"]["arguments"] += fragment.function.arguments
 
-    # If no tool calls, stream the response
+    # No tool calls: the answer has already been streamed
     if not tool_calls:
-        # Re-run with streaming for the final response
-        stream = await openai_client.chat.completions.create(
-            model=request.model,
-            messages=messages,
-            temperature=request.temperature,
-            max_tokens=request.max_tokens or 1000,
-            stream=True,
-        )
-        async for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
         return
 
     # Process tool calls
-    messages.append(response_message)
+    tool_calls = [tool_calls[idx] for idx in sorted(tool_calls)]
+    messages.append(
+        {
+            "role": "assistant",
+            "content": "".join(content_parts) or None,
+            "tool_calls": tool_calls,
+        }
+    )
 
-    for tool_call in tool_calls:
-        function_name = tool_call.function.name
-        function_args = json.loads(tool_call.function.arguments)
+    # Tools are independent lookups, run them concurrently
+    async def run_tool(tool_call):
+        function_name = tool_call["function"]["name"]
+        try:
+            function_args = orjson.loads(tool_call["function"]["arguments"])
+        except orjson.JSONDecodeError as e:
+            # Malformed arguments fail this call only, like any other tool error
+            logger.warning("Invalid arguments for function {}: {}", function_name, e)
+            return orjson.dumps({"error": f"Error executing function: {e}"}).decode()
+        return await execute_function(function_name, function_args)
 
-        # Execute the function
-        function_response = await execute_function(function_name, function_args)
+    function_responses = await asyncio.gather(
+        *(run_tool(tool_call) for tool_call in tool_calls)
+    )
 
-        # Add function response to messages
+    # Add function responses to messages, in the order the model asked
+    for tool_call, function_response in zip(tool_calls, function_responses):
         messages.append(
             {
-                "tool_call_id": tool_call.id,
+                "tool_call_id": tool_call["id"],
                 "role": "tool",
-                "name": function_name,
+                "name": tool_call["function"]["name"],
                 "content": function_response,
             }
         )
 
     # Get final response with function results and stream it
-    stream = await openai_client.chat.completions.create(
+    stream = await openai_chat(
         model=request.model,
         messages=messages,
         temperature=request.temperature,
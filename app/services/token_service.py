@@ -1,22 +1,90 @@
 """Token service for fetching token data from database."""
 
+import asyncio
+import time
 from typing import Optional
+from loguru import logger
+from prisma.partials import TokenDetails, TokenSummary
+from app.core.cache import cached
 from app.core.database import db
 
+TOKEN_CACHE_TTL = 60  # seconds
+SEARCH_CACHE_MAX_LIMIT = 50  # Larger searches aren't cached to bound memory
+RECENT_TOKENS_TTL = 15  # seconds
+
+# Recent tokens and their prompt context are read on every chat turn, keep
+# them in process per limit
+_recent_tokens_cache: dict[int, tuple[float, list, str]] = {}
+_recent_tokens_lock = asyncio.Lock()
+
+
+# Descriptions are cut to 200 characters in the database, long ones never
+# leave Postgres in full
+SEARCH_TOKENS_SQL = """
+SELECT address, name, tier, label,
+       LEFT(COALESCE(NULLIF(description_en, ''), description, ''), 200) AS description
+FROM public.tokens
+WHERE archived_at IS NULL AND (name ILIKE $1 OR label ILIKE $1)
+ORDER BY ordering ASC
+LIMIT $2
+"""
+
+
+def token_cache_key(name: str) -> str:
+    """Cache key of a get_token_by_name lookup."""
+    return f"tok:{name.lower().strip()}"
+
+
+def search_cache_key(query: str, limit: int = 10) -> str | None:
+    """Cache key of a search_tokens lookup, None when it shouldn't be cached."""
+    if limit > SEARCH_CACHE_MAX_LIMIT:
+        return None
+    return f"tok-search:{query.lower().strip()}:{limit}"
+
+
+def _cached_recent_tokens(limit: int) -> tuple[list, str] | None:
+    entry = _recent_tokens_cache.get(limit)
+    if entry and time.monotonic() - entry[0] < RECENT_TOKENS_TTL:
+        return entry[1], entry[2]
+    return None
+
+
+async def get_recent_tokens_with_context(limit: int = 50) -> tuple[list, str]:
+    """
+    Fetch recent tokens and their system prompt context.
+
+    Both are cached for RECENT_TOKENS_TTL, so the context string is only
+    rebuilt when the tokens are refetched.
+    """
+    cached_entry = _cached_recent_tokens(limit)
+    if cached_entry is not None:
+        return cached_entry
+
+    # Only one request refills the cache, the others wait and reuse it
+    async with _recent_tokens_lock:
+        cached_entry = _cached_recent_tokens(limit)
+        if cached_entry is not None:
+            return cached_entry
+
+        try:
+            tokens = await TokenSummary.prisma(db).find_many(
+                where={"archived_at": None},
+                take=limit,
+                order={"ordering": "asc"},
+            )
+        except Exception:
+            logger.exception("Error fetching tokens")
+            return [], ""
+
+        token_context = build_token_context(tokens)
+        _recent_tokens_cache[limit] = (time.monotonic(), tokens, token_context)
+        return tokens, token_context
+
 
 async def get_recent_tokens(limit: int = 50):
     """Fetch recent tokens for chat context."""
-    try:
-        tokens = await db.tokens.find_many(
-            where={"archived_at": None},
-            take=limit,
-            order={"ordering": "asc"},
-            include={"name": True, "address": True, "tier": True, "label": True},
-        )
-        return tokens
-    except Exception as e:
-        print(f"Error fetching tokens: {e}")
-        return []
+    tokens, _ = await get_recent_tokens_with_context(limit)
+    return tokens
 
 
 def build_token_context(tokens: list) -> str:
@@ -30,6 +98,7 @@ def build_token_context(tokens: list) -> str:
     return f"\n\nCurrent tokens in PACETERMINAL database (for reference): {token_list}"
 
 
+@cached(token_cache_key, ttl=TOKEN_CACHE_TTL)
 async def get_token_by_name(name: str) -> Optional[dict]:
     """
     Get detailed token information by name (case-insensitive search).
@@ -37,7 +106,7 @@ async def get_token_by_name(name: str) -> Optional[dict]:
     Returns token with all details including teams, metrics, technical analysis.
     """
     try:
-        token = await db.tokens.find_first(
+        token = await TokenDetails.prisma(db).find_first(
             where={
                 "archived_at": None,
                 "name": {"contains": name, "mode": "insensitive"},
@@ -95,40 +164,24 @@ async def get_token_by_name(name: str) -> Optional[dict]:
             ],
             "has_flywheel": bool(token.flywheels),
         }
-    except Exception as e:
-        print(f"Error fetching token by name '{name}': {e}")
+    except Exception:
+        logger.exception("Error fetching token by name '{}'", name)
         return None
 
 
+@cached(search_cache_key, ttl=TOKEN_CACHE_TTL)
 async def search_tokens(query: str, limit: int = 10) -> list[dict]:
     """
     Search tokens by name or label (case-insensitive).
 
     Returns basic token information for matching tokens.
     """
+    # LIKE wildcards in the query are matched literally, as with Prisma's contains
+    pattern = "%{}%".format(
+        query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
     try:
-        tokens = await db.tokens.find_many(
-            where={
-                "archived_at": None,
-                "OR": [
-                    {"name": {"contains": query, "mode": "insensitive"}},
-                    {"label": {"contains": query, "mode": "insensitive"}},
-                ],
-            },
-            take=limit,
-            order={"ordering": "asc"},
-        )
-
-        return [
-            {
-                "address": token.address,
-                "name": token.name,
-                "tier": token.tier,
-                "label": token.label,
-                "description": (token.description_en or token.description or "")[:200],
-            }
-            for token in tokens
-        ]
-    except Exception as e:
-        print(f"Error searching tokens with query '{query}': {e}")
+        return await db.query_raw(SEARCH_TOKENS_SQL, pattern, limit)
+    except Exception:
+        logger.exception("Error searching tokens with query '{}'", query)
         return []
@@ -1,23 +1,59 @@
 from celery import Task
+from celery.signals import task_postrun
 from loguru import logger
 from app.celery import app
 
-from app.llm.utils import openai_client, tavily_client
-import json
+from app.llm.utils import openai_chat, tavily_client, truncate
+import orjson
 import asyncio
-
-
-class CallbackTask(Task):
-    """Base task with progress callback support"""
-
-    def update_progress(self, state: str, meta: dict):
-        """Update task state with progress information"""
-        self.update_state(state=state, meta=meta)
-
-
-async def call_research_plan(query: str, user_context: dict = None):
-    """Decompose financial query into structured research sub-questions"""
-    SYSTEM_PROMPT = """
+import re
+import time
+from functools import cache, partial
+import tiktoken
+from hashlib import blake2b
+from textwrap import dedent
+from typing import Final
+
+from app.core.cache import cached
+from app.llm.cache import llm_cache_key, normalize_text
+from app.tasks import progress_writer, runtime
+from app.tasks.keys import analysis_dedup_key, progress_channel
+
+# Repeat queries reuse earlier LLM output, for the exact same input only: queries
+# that differ only in ticker or date read almost alike, and analyses and reviews
+# depend on the exact text they are built on. Plans are keyed on the normalized
+# query, so casing and spacing differences still hit.
+LLM_CACHE_TTL = 60 * 60  # seconds
+
+# Long completions are streamed, and the tail of the text so far is published
+# as progress at most once per interval
+PARTIAL_PROGRESS_INTERVAL = 1.0  # seconds
+PARTIAL_PREVIEW_CHARS = 500
+
+# Tavily results are shared between tasks: the three searches of a task are
+# derived from its query, so similar queries overlap heavily
+SEARCH_CACHE_TTL = 6 * 60 * 60  # seconds
+RECENT_SEARCH_CACHE_TTL = 60 * 60  # seconds
+
+# Search results fetched per query
+MAX_SEARCH_RESULTS = 5
+
+# Prompt budgets: long scraped pages and analyses are cut down to what the
+# model needs instead of being sent whole
+SEARCH_RESULT_TOKEN_BUDGET = 1500  # tokens per search result
+ANALYSIS_TOKEN_BUDGET = 3000  # tokens of analysis to review
+
+# Reviews go to gpt-4o-mini first, and are redone by gpt-4.1-mini when it isn't
+# sure or its score is this close to the quality threshold
+REFLECTION_ESCALATION_MARGIN = 0.5
+
+# Queries about recent events only search the last 30 days
+_RECENT_QUERY = re.compile(r"recent|latest|current|2024|2025", re.IGNORECASE)
+
+# System prompts are built once at import; only the user message varies per call.
+# They are dedented so the prefix stays compact and byte-identical across calls,
+# which is what lets OpenAI's prompt caching reuse it.
+_RESEARCH_PLAN_SYSTEM: Final[str] = dedent("""
         You are a financial research strategist who breaks down complex market questions into investigable components.
 
         # YOUR TASK
@@ -56,71 +92,14 @@ async def call_research_plan(query: str, user_context: dict = None):
         - Identify what data sources are needed for each dimension
         - Flag dependencies between sub-questions
         - Keep it focused: 4-6 dimensions maximum
-        """
+        """).strip()
 
-    context_str = ""
-    if user_context:
-        context_str = f"""
-            User Context:
-            - Portfolio: {user_context.get("portfolio", "Not specified")}
-            - Time horizon: {user_context.get("time_horizon", "Not specified")}
-            - Risk tolerance: {user_context.get("risk_tolerance", "Not specified")}
-        """
-
-    res = await openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": f"""
-                    Create a research plan for this financial question:
-                    {query}{context_str}
-                    """,
-            },
-        ],
-    )
-    return res.choices[0].message.content
-
-
-async def call_resource_search(query: str, context: str = None):
-    """Internet search for financial data, research, and market intelligence"""
-    search_params = {
-        "query": query,
-        "include_raw_content": "markdown",
-        "max_results": 5,
-    }
-
-    if any(
-        term in query.lower()
-        for term in ["recent", "latest", "current", "2024", "2025"]
-    ):
-        search_params["days"] = 30
-
-    res = await tavily_client.search(**search_params)
-    search_results = res.get("results", [])
-
-    logger.info(
-        f"Successfully retrieved {len(search_results)} financial search results"
-    )
-
-    processed_results = []
-    for idx, result in enumerate(search_results[:8], 1):
-        raw_content = result.get("raw_content") or result.get("content") or ""
-        truncated_content = (
-            raw_content[:1500] + "..." if len(raw_content) > 1500 else raw_content
-        )
-
-        processed_results.append(
-            {
-                "title": result.get("title", ""),
-                "url": result.get("url", ""),
-                "content": truncated_content,
-                "score": result.get("score", 0),
-            }
-        )
+_RESEARCH_PLAN_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _RESEARCH_PLAN_SYSTEM,
+}
 
-    SYSTEM_PROMPT = """
+_RESOURCE_SEARCH_SYSTEM: Final[str] = dedent("""
         You are a financial intelligence analyst extracting key insights from web sources.
 
         # TASK
@@ -160,54 +139,266 @@ async def call_resource_search(query: str, context: str = None):
         - Include multiple perspectives
         - Flag opinion vs. data
         - Be concise but precise
+        """).strip()
+
+_RESOURCE_SEARCH_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _RESOURCE_SEARCH_SYSTEM,
+}
+
+# Simplified version for Celery task
+_GENERATE_ANALYSIS_SYSTEM: Final[str] = dedent("""
+        You are a financial analyst who synthesizes research into clear, actionable insights.
+
+        Build a logical analysis by connecting research findings into causal chains and scenario models.
+        Provide executive summary, key findings, scenario analysis, and actionable implications.
+        """).strip()
+
+_GENERATE_ANALYSIS_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _GENERATE_ANALYSIS_SYSTEM,
+}
+
+_SELF_REFLECTION_SYSTEM: Final[str] = dedent("""
+        You are a quality assurance analyst validating financial research.
+
+        Audit the analysis for gaps, contradictions, and quality issues. Suggest improvements.
+        Provide overall quality score and recommendations.
+        """).strip()
+
+_SELF_REFLECTION_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _SELF_REFLECTION_SYSTEM,
+}
+
+# First-pass review by the small model, structured so its confidence can be checked
+_QUICK_REFLECTION_SYSTEM: Final[str] = (
+    _SELF_REFLECTION_SYSTEM
+    + "\n\n"
+    + dedent("""
+        Respond with a JSON object with these keys:
+        - "score": overall quality score from 0 to 10
+        - "reflection": the full review in markdown, including the score and recommendations
+        - "uncertain": true if you are not confident in the score
+        """).strip()
+)
+
+_QUICK_REFLECTION_MESSAGE: Final[dict] = {
+    "role": "system",
+    "content": _QUICK_REFLECTION_SYSTEM,
+}
+
+
+@cache
+def _encoding() -> tiktoken.Encoding:
+    """gpt-4.1-mini's tokenizer, loaded on first use"""
+    return tiktoken.get_encoding("o200k_base")
+
+
+def _trim_to_budget(text: str, max_tokens: int) -> str:
+    """Cut text down to its first max_tokens tokens for gpt-4.1-mini."""
+    # Scraped pages can contain special token markers, they count as plain text
+    tokens = _encoding().encode_ordinary(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return _encoding().decode(tokens[:max_tokens])
+
+
+class CallbackTask(Task):
+    """Base task with progress callback support"""
+
+    def update_progress(self, state: str, meta: dict, task_id: str = None):
         """
+        Update task state with progress information
+
+        The update is queued and written by a background thread. Code running
+        outside the task's own thread, like the worker's event loop, has to
+        pass task_id: the current request is thread-local.
+        """
+        progress_writer.put(self, task_id or self.request.id, state, meta)
+
+    def publish_progress(self, state: str, meta: dict = None, task_id: str = None):
+        """Push a state change to SSE subscribers of this task"""
+        try:
+            self.backend.client.publish(
+                progress_channel(task_id or self.request.id),
+                orjson.dumps({"state": state, "meta": meta or {}}),
+            )
+        except Exception as e:
+            # Subscribers fall back to the result backend, never fail the task
+            logger.warning("Failed to publish progress: {}", e)
+
+    def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        """Notify subscribers once the final result is stored"""
+        self.publish_progress(status)
+
+
+async def _complete(on_partial=None, **kwargs) -> str | None:
+    """
+    Run a chat completion and return its text.
+
+    With on_partial, the completion is streamed and on_partial is called with
+    the text so far, at most once every PARTIAL_PROGRESS_INTERVAL seconds.
+    """
+    if on_partial is None:
+        res = await openai_chat(**kwargs)
+        return res.choices[0].message.content
+
+    stream = await openai_chat(stream=True, **kwargs)
+    parts = []
+    last_report = time.monotonic()
+    async for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        parts.append(chunk.choices[0].delta.content)
+        now = time.monotonic()
+        if now - last_report >= PARTIAL_PROGRESS_INTERVAL:
+            last_report = now
+            on_partial("".join(parts))
+    return "".join(parts) or None
+
+
+def research_plan_cache_key(
+    query: str, user_context: dict = None, on_partial=None
+) -> str:
+    """Cache key of a research plan, casing and spacing of the query aside."""
+    return llm_cache_key("task_research_plan", normalize_text(query), user_context)
+
+
+@cached(research_plan_cache_key, ttl=LLM_CACHE_TTL)
+async def call_research_plan(query: str, user_context: dict = None, on_partial=None):
+    """Decompose financial query into structured research sub-questions"""
+    context_str = ""
+    if user_context:
+        context_str = f"""
+            User Context:
+            - Portfolio: {user_context.get("portfolio", "Not specified")}
+            - Time horizon: {user_context.get("time_horizon", "Not specified")}
+            - Risk tolerance: {user_context.get("risk_tolerance", "Not specified")}
+        """
+
+    return await _complete(
+        on_partial,
+        model="gpt-4.1-mini",
+        messages=[
+            _RESEARCH_PLAN_MESSAGE,
+            {
+                "role": "user",
+                "content": f"""
+                    Create a research plan for this financial question:
+                    {query}{context_str}
+                    """,
+            },
+        ],
+        prompt_cache_key="task_research_plan_v1",
+    )
+
+
+def tavily_cache_key(**search_params) -> str:
+    """Cache key of a Tavily search, covering all of its parameters."""
+    digest = blake2b(
+        orjson.dumps(search_params, option=orjson.OPT_SORT_KEYS), digest_size=16
+    ).hexdigest()
+    return f"tavily:{digest}"
+
+
+def tavily_cache_ttl(**search_params) -> int:
+    """Recent-event searches go stale faster than background research."""
+    return RECENT_SEARCH_CACHE_TTL if "days" in search_params else SEARCH_CACHE_TTL
+
+
+@cached(tavily_cache_key, ttl=tavily_cache_ttl)
+async def search_tavily(**search_params) -> dict:
+    """Tavily search, cached in Redis"""
+    return await tavily_client.search(**search_params)
+
+
+async def call_resource_search(query: str, context: str = None):
+    """Internet search for financial data, research, and market intelligence"""
+    search_params = {
+        "query": query,
+        "include_raw_content": "markdown",
+        "max_results": MAX_SEARCH_RESULTS,
+    }
+
+    if _RECENT_QUERY.search(query):
+        search_params["days"] = 30
+
+    res = await search_tavily(**search_params)
+    search_results = res.get("results", [])
+
+    logger.info(
+        "Successfully retrieved {} financial search results", len(search_results)
+    )
+
+    processed_results = [
+        {
+            "title": result.get("title", ""),
+            "url": result.get("url", ""),
+            "content": truncate(
+                result.get("raw_content") or result.get("content") or ""
+            ),
+            "score": result.get("score", 0),
+        }
+        for result in search_results
+    ]
 
     context_str = f"\n\nContext: {context}" if context else ""
 
-    res = await openai_client.chat.completions.create(
+    res = await openai_chat(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
+            _RESOURCE_SEARCH_MESSAGE,
             {
                 "role": "user",
                 "content": f"""
                     Query: {query}{context_str}
 
                     Search Results:
-                    {json.dumps(processed_results, indent=2)}
+                    {orjson.dumps(processed_results).decode()}
                     """,
             },
         ],
         temperature=0.3,
         max_tokens=2000,
+        prompt_cache_key="task_resource_search_v1",
     )
 
     logger.info("Successfully generated financial search results")
     return res.choices[0].message.content
 
 
+def generate_analysis_cache_key(
+    research_plan: str,
+    search_results: list,
+    reasoning_depth: str = "standard",
+    on_partial=None,
+) -> str:
+    """Cache key of an analysis of the exact plan and search results."""
+    return llm_cache_key(
+        "task_generate_analysis", research_plan, search_results, reasoning_depth
+    )
+
+
+@cached(generate_analysis_cache_key, ttl=LLM_CACHE_TTL)
 async def call_generate_analysis(
     research_plan: str,
     search_results: list,
     reasoning_depth: str = "standard",
+    on_partial=None,
 ):
     """Synthesize research findings into structured financial analysis"""
-    # Simplified version for Celery task
-    SYSTEM_PROMPT = """
-        You are a financial analyst who synthesizes research into clear, actionable insights.
-
-        Build a logical analysis by connecting research findings into causal chains and scenario models.
-        Provide executive summary, key findings, scenario analysis, and actionable implications.
-        """
-
+    # A search whose summary came back empty, e.g. on a refusal, is left out
     search_summary = "\n\n".join(
-        [f"**Source {i + 1}**: {result}" for i, result in enumerate(search_results)]
+        f"**Source {i}**: {_trim_to_budget(result, SEARCH_RESULT_TOKEN_BUDGET)}"
+        for i, result in enumerate(filter(None, search_results), 1)
     )
 
-    res = await openai_client.chat.completions.create(
+    return await _complete(
+        on_partial,
         model="gpt-4.1-mini",
         messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
+            _GENERATE_ANALYSIS_MESSAGE,
             {
                 "role": "user",
                 "content": f"""
@@ -223,40 +414,65 @@ async def call_generate_analysis(
                     """,
             },
         ],
+        prompt_cache_key="task_generate_analysis_v1",
     )
 
-    return res.choices[0].message.content
-
 
-async def call_self_reflection(analysis: str, quality_threshold: float = 8.0):
-    """Validate analysis quality and identify gaps"""
-    SYSTEM_PROMPT = """
-        You are a quality assurance analyst validating financial research.
+def self_reflection_cache_key(
+    analysis: str, quality_threshold: float = 8.0, on_partial=None
+) -> str:
+    """Cache key of a review of the exact analysis."""
+    return llm_cache_key("task_self_reflection", analysis, quality_threshold)
 
-        Audit the analysis for gaps, contradictions, and quality issues. Suggest improvements.
-        Provide overall quality score and recommendations.
-        """
 
-    res = await openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": f"""
+@cached(self_reflection_cache_key, ttl=LLM_CACHE_TTL)
+async def call_self_reflection(
+    analysis: str, quality_threshold: float = 8.0, on_partial=None
+):
+    """Validate analysis quality and identify gaps"""
+    user_message = {
+        "role": "user",
+        "content": f"""
                     Validate this financial analysis:
-                    {analysis}
+                    {_trim_to_budget(analysis, ANALYSIS_TOKEN_BUDGET)}
                     
                     Quality threshold: {quality_threshold}/10
                     """,
-            },
-        ],
+    }
+
+    async def quick_review() -> str | None:
+        """Small model review, None when its verdict is too close to call"""
+        content = await _complete(
+            model="gpt-4o-mini",
+            messages=[_QUICK_REFLECTION_MESSAGE, user_message],
+            response_format={"type": "json_object"},
+            prompt_cache_key="task_self_reflection_quick_v1",
+        )
+        try:
+            review = orjson.loads(content or "")
+            score = float(review["score"])
+            reflection = review["reflection"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        if (
+            review.get("uncertain")
+            or abs(score - quality_threshold) < REFLECTION_ESCALATION_MARGIN
+            or not isinstance(reflection, str)
+        ):
+            return None
+        return reflection or None
+
+    return await quick_review() or await _complete(
+        on_partial,
+        model="gpt-4.1-mini",
+        messages=[_SELF_REFLECTION_MESSAGE, user_message],
+        prompt_cache_key="task_self_reflection_v1",
     )
-    return res.choices[0].message.content
 
 
 async def financial_analysis(
     task_instance,
+    task_id: str,
     query: str,
     user_context: dict = None,
     reasoning_depth: str = "standard",
@@ -266,6 +482,7 @@ async def financial_analysis(
 
     Args:
         task_instance: The Celery task instance for progress updates
+        task_id: Id of the running task
         query: The financial question to analyze
         user_context: Optional user context (portfolio, risk tolerance, etc.)
         reasoning_depth: How deep to go with analysis
@@ -275,83 +492,132 @@ async def financial_analysis(
     """
     try:
         self = task_instance
+        update_progress = partial(self.update_progress, task_id=task_id)
+
+        def report_partial(phase: str, message: str, progress: int):
+            """Progress callback publishing the tail of a streamed completion"""
+
+            def report(text: str):
+                update_progress(
+                    state="PROGRESS",
+                    meta={
+                        "phase": phase,
+                        "status": "in_progress",
+                        "message": message,
+                        "progress": max(progress, current_progress),
+                        "partial": text[-PARTIAL_PREVIEW_CHARS:],
+                    },
+                )
+
+            return report
+
         result = {
             "query": query,
             "phases": {},
             "status": "processing",
         }
 
-        # Phase 1: Research Planning
-        logger.info(f"Task {self.request.id}: Starting research planning")
-        self.update_progress(
-            state="PROGRESS",
-            meta={
-                "phase": "planning",
-                "status": "started",
-                "message": "📋 Decomposing financial query into research dimensions...",
-                "progress": 10,
-            },
-        )
+        # Phases 1 and 2 run concurrently: the searches only need the query,
+        # the plan isn't used before the analysis. Progress advances as either
+        # one makes headway, so it never moves backwards.
+        current_progress = 10
 
-        plan = await call_research_plan(query, user_context)
-        if not plan:
-            raise ValueError("Failed to generate research plan")
-        result["phases"]["planning"] = plan
+        def advance(step: int) -> int:
+            nonlocal current_progress
+            current_progress += step
+            return current_progress
 
-        self.update_progress(
+        logger.info("Task {}: Starting research planning and search", task_id)
+        update_progress(
             state="PROGRESS",
             meta={
                 "phase": "planning",
-                "status": "completed",
-                "message": "✅ Research plan created",
-                "progress": 25,
-                "result": plan,
+                "status": "started",
+                "message": "📋 Decomposing financial query into research dimensions...",
+                "progress": current_progress,
             },
         )
-
-        # Phase 2: Resource Search (Multiple searches)
-        logger.info(f"Task {self.request.id}: Starting resource search")
-        self.update_progress(
+        update_progress(
             state="PROGRESS",
             meta={
                 "phase": "research",
                 "status": "started",
                 "message": "🔍 Gathering market data, news, and expert analysis...",
-                "progress": 30,
+                "progress": current_progress,
             },
         )
 
+        # Phase 1: Research Planning
+        async def plan_phase():
+            plan = await call_research_plan(
+                query,
+                user_context,
+                on_partial=report_partial(
+                    "planning", "📋 Drafting the research plan...", 15
+                ),
+            )
+            if not plan:
+                raise ValueError("Failed to generate research plan")
+            result["phases"]["planning"] = plan
+
+            update_progress(
+                state="PROGRESS",
+                meta={
+                    "phase": "planning",
+                    "status": "completed",
+                    "message": "✅ Research plan created",
+                    "progress": advance(15),
+                    "result": plan,
+                },
+            )
+            return plan
+
+        # Phase 2: Resource Search (Multiple searches)
         # Extract search queries from plan (simplified - adjust based on your plan structure)
-        search_results = []
         search_queries = [
             query,  # Main query
             f"{query} market analysis",
             f"{query} expert opinion",
         ]
 
-        for idx, search_query in enumerate(search_queries):
-            logger.info(f"Task {self.request.id}: Searching - {search_query}")
-            search_result = await call_resource_search(
+        # Searches run concurrently; progress counts them as they finish and
+        # results keep the order of search_queries
+        search_results = [None] * len(search_queries)
+        searches_completed = 0
+
+        async def search(idx: int, search_query: str):
+            nonlocal searches_completed
+            logger.info("Task {}: Searching - {}", task_id, search_query)
+            search_results[idx] = await call_resource_search(
                 search_query, context=f"Research for: {query}"
             )
-            search_results.append(search_result)
+            searches_completed += 1
 
-            progress = 30 + (idx + 1) * 10  # 30, 40, 50
-            self.update_progress(
+            update_progress(
                 state="PROGRESS",
                 meta={
                     "phase": "research",
                     "status": "in_progress",
-                    "message": f"🔍 Completed search {idx + 1}/{len(search_queries)}",
-                    "progress": progress,
-                    "searches_completed": idx + 1,
+                    "message": f"🔍 Completed search {searches_completed}/{len(search_queries)}",
+                    "progress": advance(10),
+                    "searches_completed": searches_completed,
                     "total_searches": len(search_queries),
                 },
             )
 
+        # The first failure cancels the remaining calls instead of letting them
+        # spend tokens on a task that has already failed
+        try:
+            async with asyncio.TaskGroup() as tg:
+                plan_task = tg.create_task(plan_phase())
+                for idx, search_query in enumerate(search_queries):
+                    tg.create_task(search(idx, search_query))
+        except ExceptionGroup as eg:
+            raise eg.exceptions[0]
+        plan = plan_task.result()
         result["phases"]["research"] = search_results
 
-        self.update_progress(
+        update_progress(
             state="PROGRESS",
             meta={
                 "phase": "research",
@@ -362,8 +628,8 @@ async def financial_analysis(
         )
 
         # Phase 3: Generate Analysis
-        logger.info(f"Task {self.request.id}: Generating analysis")
-        self.update_progress(
+        logger.info("Task {}: Generating analysis", task_id)
+        update_progress(
             state="PROGRESS",
             meta={
                 "phase": "analysis",
@@ -377,12 +643,13 @@ async def financial_analysis(
             research_plan=plan or "",
             search_results=search_results,
             reasoning_depth=reasoning_depth,
+            on_partial=report_partial("analysis", "🎯 Writing the analysis...", 70),
         )
         if not analysis_result:
             raise ValueError("Failed to generate analysis")
         result["phases"]["analysis"] = analysis_result
 
-        self.update_progress(
+        update_progress(
             state="PROGRESS",
             meta={
                 "phase": "analysis",
@@ -393,8 +660,8 @@ async def financial_analysis(
         )
 
         # Phase 4: Self-Reflection
-        logger.info(f"Task {self.request.id}: Running self-reflection")
-        self.update_progress(
+        logger.info("Task {}: Running self-reflection", task_id)
+        update_progress(
             state="PROGRESS",
             meta={
                 "phase": "validation",
@@ -406,10 +673,11 @@ async def financial_analysis(
 
         reflection = await call_self_reflection(
             analysis_result or "",
+            on_partial=report_partial("validation", "🔧 Reviewing the analysis...", 92),
         )
         result["phases"]["validation"] = reflection
 
-        self.update_progress(
+        update_progress(
             state="PROGRESS",
             meta={
                 "phase": "validation",
@@ -421,13 +689,13 @@ async def financial_analysis(
 
         # Mark as complete
         result["status"] = "completed"
-        logger.info(f"Task {self.request.id}: Analysis completed successfully")
+        logger.info("Task {}: Analysis completed successfully", task_id)
 
         return result
 
     except Exception as e:
-        logger.error(f"Task {self.request.id} failed: {str(e)}")
-        self.update_progress(
+        logger.error("Task {} failed: {}", task_id, e)
+        update_progress(
             state="FAILURE",
             meta={
                 "phase": "error",
@@ -456,8 +724,8 @@ def financial_analysis_task(
     """
     Complete financial analysis workflow as a Celery task
 
-    This is a synchronous wrapper that runs the async implementation using asyncio.run()
-    to ensure proper async handling within Celery.
+    This is a synchronous wrapper that runs the async implementation on the
+    worker's persistent event loop to ensure proper async handling within Celery.
 
     Args:
         query: The financial question to analyze
@@ -467,4 +735,32 @@ def financial_analysis_task(
     Returns:
         dict: Complete analysis results with all phases
     """
-    return asyncio.run(financial_analysis(self, query, user_context, reasoning_depth))
+    try:
+        return runtime.run(
+            financial_analysis(
+                self, self.request.id, query, user_context, reasoning_depth
+            ),
+            timeout=self.soft_time_limit,
+        )
+    finally:
+        # A late progress write would overwrite the final state. After a
+        # timeout the coroutine may still be unwinding, its updates are dropped.
+        progress_writer.finish(self.request.id)
+
+
+@task_postrun.connect(sender=financial_analysis_task)
+def release_dedup_key(task=None, kwargs=None, state=None, **extra):
+    """Drop the dedup key of an unsuccessful run so the query can be retried"""
+    if state == "SUCCESS" or not kwargs:
+        return
+
+    try:
+        task.backend.client.delete(
+            analysis_dedup_key(
+                kwargs.get("query"),
+                kwargs.get("user_context"),
+                kwargs.get("reasoning_depth", "standard"),
+            )
+        )
+    except Exception as e:
+        logger.warning("Failed to release dedup key: {}", e)
@@ -0,0 +1,28 @@
+"""Redis keys shared by the analysis task and the API.
+
+Kept free of Celery imports so the API can use them without loading Celery.
+"""
+
+import hashlib
+import json
+
+DEDUP_KEY_TTL = 3600  # Matches result_expires so reused ids stay resolvable
+
+
+def analysis_dedup_key(
+    query: str, user_context: dict = None, reasoning_depth: str = "standard"
+) -> str:
+    """Redis key shared by identical analysis requests"""
+    payload = json.dumps([query, user_context, reasoning_depth], sort_keys=True)
+    digest = hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+    return f"analysis:{digest}"
+
+
+def analysis_task_key(task_id: str) -> str:
+    """Redis key pointing from a task id back to its dedup key"""
+    return f"analysis-task:{task_id}"
+
+
+def progress_channel(task_id: str) -> str:
+    """Redis pub/sub channel that carries state changes for a task"""
+    return f"task-progress:{task_id}"
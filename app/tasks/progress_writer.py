@@ -0,0 +1,108 @@
+"""Background writer for task progress updates.
+
+Storing progress in the result backend and publishing it are blocking Redis
+round-trips. Tasks queue them here instead, so the event loop driving their LLM
+calls is never held up by progress reporting.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+from loguru import logger
+
+# Updates queued within this window are written together, and only the latest
+# state of each task is stored in the result backend
+COALESCE_WINDOW = 0.25  # seconds
+
+# Finished task ids remembered to drop their late updates. A cancelled coroutine
+# stops within moments, so only recent tasks need to be kept.
+MAX_FINISHED_TASKS = 1024
+
+_queue: queue.Queue = queue.Queue()
+_thread: threading.Thread | None = None
+_cond = threading.Condition()
+_pending: dict[str, int] = {}  # Queued, unwritten updates per task
+_finished: OrderedDict[str, None] = OrderedDict()
+
+
+def _reset_after_fork():
+    # The writer thread doesn't survive fork, prefork children start their own
+    global _queue, _thread, _cond, _pending, _finished
+    _queue = queue.Queue()
+    _thread = None
+    _cond = threading.Condition()
+    _pending = {}
+    _finished = OrderedDict()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _write(batch: list):
+    latest = {}
+    for task, task_id, state, meta in batch:
+        latest[task_id] = (task, state, meta)
+    for task_id, (task, state, meta) in latest.items():
+        try:
+            task.backend.store_result(task_id, meta, state)
+        except Exception as e:
+            logger.warning("Failed to store progress of task {}: {}", task_id, e)
+
+    # Subscribers get every update, in order
+    for task, task_id, state, meta in batch:
+        task.publish_progress(state, meta, task_id=task_id)
+
+
+def _run():
+    while True:
+        batch = [_queue.get()]
+        time.sleep(COALESCE_WINDOW)
+        while True:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write(batch)
+        finally:
+            with _cond:
+                for _, task_id, _, _ in batch:
+                    _pending[task_id] -= 1
+                    if not _pending[task_id]:
+                        del _pending[task_id]
+                _cond.notify_all()
+
+
+def put(task, task_id: str, state: str, meta: dict):
+    """
+    Queue a progress update of a task, the writer thread starts on first use.
+
+    Updates of a task that has finished are dropped.
+    """
+    global _thread
+    with _cond:
+        if task_id in _finished:
+            return
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_run, name="task-progress-writer", daemon=True
+            )
+            _thread.start()
+        _pending[task_id] = _pending.get(task_id, 0) + 1
+    _queue.put((task, task_id, state, meta))
+
+
+def finish(task_id: str):
+    """
+    Block until the queued updates of a task are written, and drop later ones.
+
+    Only waits on this task, updates of other running tasks don't hold it up.
+    """
+    with _cond:
+        _finished[task_id] = None
+        while len(_finished) > MAX_FINISHED_TASKS:
+            _finished.popitem(last=False)
+        _cond.wait_for(lambda: task_id not in _pending)
@@ -0,0 +1,52 @@
+"""Long-lived event loop for the async parts of Celery tasks."""
+
+import asyncio
+import os
+import threading
+
+import uvloop
+
+_loop: asyncio.AbstractEventLoop | None = None
+_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    # The loop thread doesn't survive fork, prefork children start their own
+    global _loop, _lock
+    _loop = None
+    _lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    The worker process' event loop, started on first use.
+
+    It runs forever in a daemon thread, so clients bound to it (HTTP pools,
+    Redis connections) are reused across tasks instead of rebuilt per task.
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = uvloop.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="task-event-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def run(coro, timeout: float | None = None):
+    """
+    Run a coroutine on the worker's event loop and wait for its result.
+
+    The coroutine is cancelled if waiting times out or the calling thread is
+    interrupted, e.g. by a Celery time limit.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, get_loop())
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
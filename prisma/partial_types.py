@@ -0,0 +1,72 @@
+"""
+Partial models, generated into prisma.partials by `prisma generate`.
+
+Queries made through a partial model only select the fields it declares,
+relations included.
+"""
+
+from prisma.models import (
+    alpha,
+    flywheels,
+    metrics_static,
+    teams,
+    technical_analysis,
+    tokens,
+)
+
+# get_token_by_name
+teams.create_partial(
+    "TeamDetails",
+    include={"name", "role", "x_account", "description"},
+)
+metrics_static.create_partial(
+    "MetricDetails",
+    include={
+        "label",
+        "label_en",
+        "value",
+        "value_en",
+        "description",
+        "description_en",
+        "source",
+    },
+)
+technical_analysis.create_partial(
+    "TechnicalAnalysisDetails",
+    include={"description", "description_en", "image"},
+)
+alpha.create_partial(
+    "AlphaDetails",
+    include={"title", "title_en", "text", "text_en"},
+)
+flywheels.create_partial("FlywheelRef", include={"address"})
+tokens.create_partial(
+    "TokenDetails",
+    include={
+        "address",
+        "name",
+        "tier",
+        "label",
+        "description",
+        "description_en",
+        "image",
+        "teams",
+        "metrics_static",
+        "technical_analysis",
+        "flywheels",
+        "alpha",
+    },
+    relations={
+        "teams": "TeamDetails",
+        "metrics_static": "MetricDetails",
+        "technical_analysis": "TechnicalAnalysisDetails",
+        "flywheels": "FlywheelRef",
+        "alpha": "AlphaDetails",
+    },
+)
+
+# get_recent_tokens
+tokens.create_partial(
+    "TokenSummary",
+    include={"address", "name", "tier", "label"},
+)